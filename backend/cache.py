@@ -0,0 +1,83 @@
+import os
+import pickle
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from cachetools import TTLCache
+
+try:
+    import redis.asyncio as redis
+    from redis.exceptions import RedisError
+except ImportError:  # Redis is optional; fall back to the in-process cache
+    redis = None
+    RedisError = ConnectionError
+
+# --- Cache backends ---
+# Redis is used when REDIS_URL is set, so several workers share one cache.
+# Otherwise, and for a short cooldown after any Redis error or timeout, values live
+# in this process.
+REDIS_URL = os.getenv("REDIS_URL")
+
+REDIS_TIMEOUT = 0.25     # seconds; a slow Redis should cost less than a cache miss
+REDIS_RETRY_AFTER = 30   # seconds to use the local cache after a Redis error
+
+_redis = (redis.from_url(REDIS_URL, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT)
+          if (redis and REDIS_URL) else None)
+_redis_down_until = 0.0  # monotonic time before which Redis is skipped
+_local_caches: Dict[int, TTLCache] = {}  # one TTLCache per TTL value
+
+
+def _active_redis():
+    """Return the Redis client, or None if it is not configured or recently failed."""
+    if _redis is None or time.monotonic() < _redis_down_until:
+        return None
+    return _redis
+
+
+def _mark_redis_down():
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+
+def _local_cache(ttl: int) -> TTLCache:
+    """Return the in-process cache holding entries that live `ttl` seconds."""
+    if ttl not in _local_caches:
+        _local_caches[ttl] = TTLCache(maxsize=256, ttl=ttl)
+    return _local_caches[ttl]
+
+
+async def _get(key: str):
+    client = _active_redis()
+    if client is not None:
+        try:
+            cached = await client.get(key)
+            return pickle.loads(cached) if cached is not None else None
+        except RedisError:
+            _mark_redis_down()
+    for cache in _local_caches.values():
+        if key in cache:
+            return cache[key]
+    return None
+
+
+async def _set(key: str, value: Any, ttl: int):
+    client = _active_redis()
+    if client is not None:
+        try:
+            await client.set(key, pickle.dumps(value), ex=ttl)
+            return
+        except RedisError:
+            _mark_redis_down()
+    _local_cache(ttl)[key] = value
+
+
+async def get_or_set(key: str, ttl: int, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Cache-aside lookup: return the value stored under `key`, or await
+    `coro_factory()` to compute it and keep the result for `ttl` seconds.
+    """
+    value = await _get(key)
+    if value is None:
+        value = await coro_factory()
+        await _set(key, value, ttl)
+    return value
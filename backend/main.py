@@ -1,21 +1,39 @@
+import asyncio
 import os
-import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
 from pathlib import Path
-from fastapi import FastAPI, HTTPException, Query
-from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from typing import Literal, Optional
 
+import httpx
+import numpy as np
+import orjson
+import pyarrow as pa
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # Brotli is optional; gzip is always available
+    BrotliMiddleware = None
+
+from ciso8601 import parse_datetime as _parse_dt
 from alpaca.trading.client import TradingClient
 from alpaca.data.historical import StockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
-from alpaca.trading.requests import GetOrdersRequest, OrderRequest
-from datetime import datetime
+from alpaca.trading.enums import OrderSide, OrderType, TimeInForce
+from alpaca.trading.requests import OrderRequest
+from alpaca.data.timeframe import TimeFrame, TimeFrameUnit
+from datetime import date, datetime, timedelta, timezone
 from pydantic import BaseModel
 
-sys.path.append(str(Path(__file__).parent.parent))
+from backend.cache import get_or_set
 from shared.utils import parse_timeframe
 
-# --- 1. Load .env for Local Dev (optional) ---
-
+# --- 1. Configuration & Clients ---
 ALPACA_API_KEY = os.getenv("APCA_API_KEY_ID")
 ALPACA_API_SECRET = os.getenv("APCA_API_SECRET_KEY")
 
@@ -29,11 +47,81 @@ data_client = StockHistoricalDataClient(
     ALPACA_API_KEY, ALPACA_API_SECRET
 )
 
+# Blocking SDK calls run here, so slow bar downloads can't starve FastAPI's shared threadpool
+ALPACA_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="alpaca")
+
+ALPACA_TRADING_URL = "https://paper-api.alpaca.markets"
+ALPACA_DATA_URL = "https://data.alpaca.markets"
+ALPACA_HEADERS = {
+    "APCA-API-KEY-ID": ALPACA_API_KEY,
+    "APCA-API-SECRET-KEY": ALPACA_API_SECRET,
+}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open one pooled, keep-alive HTTP client for the lifetime of the app."""
+    app.state.http = httpx.AsyncClient(
+        base_url=ALPACA_TRADING_URL,
+        headers=ALPACA_HEADERS,
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+    await _warm_assets_cache()
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        ALPACA_EXECUTOR.shutdown(wait=False)
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered by orjson. FastAPI deprecated its own ORJSONResponse in
+    favour of Pydantic return types, but handlers here return plain dicts holding
+    numpy arrays, which only orjson serializes without a per-element copy.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
 app = FastAPI(
     title="AlgoTrading-MVP API",
-    description="Back-end API for your AlgoTrading MVP with Alpaca and (soon) Zoya integration."
+    description="Back-end API for your AlgoTrading MVP with Alpaca and (soon) Zoya integration.",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+# Compress large responses (OHLCV bars compress ~8x); Brotli also falls back to gzip
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, quality=4, minimum_size=1024)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+async def alpaca_request(method: str, path: str, **kwargs):
+    """Call the Alpaca trading REST API over the shared connection pool."""
+    response = await app.state.http.request(method, path, **kwargs)
+    response.raise_for_status()
+    return response.json() if response.content else None
+
+async def run_sdk(func, *args, **kwargs):
+    """Run a blocking Alpaca SDK call on the dedicated executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(ALPACA_EXECUTOR, partial(func, *args, **kwargs))
+
+# Bounds concurrent per-symbol calls in batched endpoints (Alpaca allows 200 req/min)
+ALPACA_FANOUT = asyncio.Semaphore(30)
+
+async def alpaca_request_limited(method: str, path: str, **kwargs):
+    """Like `alpaca_request`, but waits for a slot in the shared fan-out semaphore."""
+    async with ALPACA_FANOUT:
+        return await alpaca_request(method, path, **kwargs)
+
+_WS_TABLE = str.maketrans("", "", " \t\r\n")
+
+def _split_symbols(symbols: str) -> list:
+    """Turn a comma-separated symbol string into a de-duplicated list of upper-case tickers."""
+    # dict.fromkeys keeps the caller's order while dropping repeats like "AAPL,aapl"
+    return list(dict.fromkeys(s for s in symbols.upper().translate(_WS_TABLE).split(",") if s))
+
 
 # --- 2. Diagnostics ---
 @app.get("/ping")
@@ -43,45 +131,148 @@ def ping():
 
 # --- 3. Account Info ---
 @app.get("/account")
-def get_account():
+async def get_account():
     """Fetch your Alpaca account state (funding, status, etc)."""
     try:
-        account = trading_client.get_account()
-        return {"account": account.dict()}
+        account = await alpaca_request("GET", "/v2/account")
+        return {"account": account}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- 4. List All Positions ---
 @app.get("/positions")
-def get_positions():
+async def get_positions():
     """List all open positions."""
     try:
-        positions = trading_client.get_all_positions()
-        return {"positions": [pos.dict() for pos in positions]}
+        positions = await alpaca_request("GET", "/v2/positions")
+        return {"positions": positions}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- 5. List All Orders ---
 @app.get("/orders")
-def get_orders(
-    status: str = Query("all", regex="^(open|closed|all)$", description="Filter orders by status"),
-    limit: int = Query(50, ge=1, le=500, description="Max number of orders to return")
+async def get_orders(
+    status: Literal["open", "closed", "all"] = Query("all", description="Filter orders by status"),
+    limit: int = Query(50, ge=1, le=500, description="Max number of orders to return"),
+    until: Optional[str] = Query(None, description="Only orders submitted before this ISO8601 time (paging cursor)")
 ):
-    """Fetch all recent orders (open, closed, or all)."""
-    filter = GetOrdersRequest(
-        status=status.lower(),
-        limit=limit
-    )
+    """Fetch recent orders (open, closed, or all), newest first, one page at a time."""
+    params = {"status": status, "limit": limit, "direction": "desc"}
+    if until:
+        params["until"] = until
 
     try:
-        orders = trading_client.get_orders(filter=filter)
-        return {"orders": [o.dict() for o in orders]}
+        orders = await alpaca_request("GET", "/v2/orders", params=params)
+        return {"orders": orders}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- 6. Get Stock Bars ---
+BARS_TTL_HISTORICAL = 7 * 24 * 3600  # bars that closed in the past never change
+BARS_TTL_RECENT = 60                 # open-ended ranges still receive new bars
+
+_UNIT_DURATION = {
+    TimeFrameUnit.Minute: timedelta(minutes=1),
+    TimeFrameUnit.Hour: timedelta(hours=1),
+    TimeFrameUnit.Day: timedelta(days=1),
+    TimeFrameUnit.Week: timedelta(weeks=1),
+    TimeFrameUnit.Month: timedelta(days=31),
+}
+
+def _bars_cache_ttl(tf_object: TimeFrame, end_dt: Optional[datetime]) -> int:
+    """Cache bars for a week once the range ends more than one bar in the past."""
+    if end_dt is None:
+        return BARS_TTL_RECENT
+    if end_dt.tzinfo is None:
+        end_dt = end_dt.replace(tzinfo=timezone.utc)  # Alpaca treats naive times as UTC
+    bar_length = _UNIT_DURATION[tf_object.unit] * tf_object.amount
+    if end_dt < datetime.now(timezone.utc) - bar_length:
+        return BARS_TTL_HISTORICAL
+    return BARS_TTL_RECENT
+
+@lru_cache(maxsize=128)
+def _make_bars_request(symbols: tuple, timeframe: str, start_dt: Optional[datetime],
+                       end_dt: Optional[datetime], limit: Optional[int], adjustment: str,
+                       sort: str, feed: Optional[str]) -> StockBarsRequest:
+    """
+    Build (and reuse) the validated SDK request for a given set of bar parameters.
+    Keyed on the canonical timeframe string (TimeFrame.value), since TimeFrame objects
+    hash by identity and equal timeframes would otherwise miss the cache.
+    """
+    return StockBarsRequest(
+        symbol_or_symbols=list(symbols),
+        timeframe=parse_timeframe(timeframe),
+        start=start_dt,
+        end=end_dt,
+        limit=limit,
+        adjustment=adjustment,
+        sort=sort,
+        feed=feed
+    )
+
+def _df_to_columnar(df) -> dict:
+    """
+    Convert one symbol's bars into column arrays, e.g.
+    {"timestamp": [epoch seconds...], "open": [...], "close": [...], ...}
+    """
+    # The index unit depends on the pandas version (ns before 3.0, us after), so convert explicitly
+    timestamps = df.index.get_level_values("timestamp").as_unit("s").asi8
+    columns = {"timestamp": timestamps}
+    for column in df.columns:
+        columns[column] = np.ascontiguousarray(df[column].to_numpy())
+    return columns
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+def _columnar_to_arrow(output: dict) -> bytes:
+    """Serialize columnar bars as one Arrow IPC stream with a dictionary-encoded `symbol` column."""
+    symbols, tables = [], []
+    for symbol, columns in output.items():
+        if columns:
+            symbols.append(symbol)
+            tables.append(pa.table(columns))
+
+    if tables:
+        table = pa.concat_tables(tables)
+        ts_index = table.schema.get_field_index("timestamp")
+        table = table.set_column(
+            ts_index, "timestamp", table["timestamp"].cast(pa.timestamp("s", tz="UTC"))
+        )
+        codes = np.repeat(np.arange(len(tables), dtype=np.int32), [t.num_rows for t in tables])
+        table = table.append_column("symbol", pa.DictionaryArray.from_arrays(codes, symbols))
+    else:
+        table = pa.table({"symbol": pa.array([], pa.string())})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def _fetch_stock_bars(request: StockBarsRequest, symbol_list: list) -> dict:
+    """Fetch bars from Alpaca and convert the DataFrame to columnar dicts keyed by symbol."""
+    try:
+        bars = data_client.get_stock_bars(request)
+        df = bars.df
+
+    except Exception as e:
+        # The SDK might raise its own validation errors (e.g., "5Day" is invalid)
+        raise HTTPException(status_code=500, detail=f"Alpaca SDK error: {str(e)}")
+
+    # Split the frame by symbol in a single pass rather than masking it once per symbol
+    if df.empty:
+        grouped = {}
+    elif "symbol" in df.index.names:
+        grouped = {
+            sym: _df_to_columnar(g)
+            for sym, g in df.groupby(level="symbol", sort=False)
+        }
+    else:
+        grouped = {symbol_list[0]: _df_to_columnar(df)}
+
+    return {symbol: grouped.get(symbol, {}) for symbol in symbol_list}
+
 @app.get("/stocks/bars")
-def get_stock_bars(
+async def get_stock_bars(
     symbols: str = Query("AAPL", description="Comma-separated stock symbols"),
     timeframe: str = Query("15Min", description="Bar interval (e.g. 1Min, 15Min, 1Hour, 1Day)"),
     limit: Optional[int] = Query(1000, description="Max bars per symbol"),
@@ -89,10 +280,15 @@ def get_stock_bars(
     start: Optional[str] = Query(None, description="Start ISO8601 date/time"),
     end: Optional[str] = Query(None, description="End ISO8601 date/time"),
     sort: str = Query("asc", description='Sort order: "asc" or "desc"'),
-    feed: Optional[str] = Query("sip", description="Data feed (e.g. sip, iex, otc)")
+    feed: Optional[str] = Query("sip", description="Data feed (e.g. sip, iex, otc)"),
+    accept: Optional[str] = Header(None)
 ):
     """
     Fetch historical OHLCV bars using a dynamically parsed timeframe.
+    Each symbol maps to column arrays, with timestamps in epoch seconds.
+    Clients sending `Accept: application/vnd.apache.arrow.stream` get a single
+    Arrow IPC table (with a `symbol` column) instead of JSON.
+    Responses are cached: 7 days for ranges that ended in the past, 60s otherwise.
     """
     # --- Use the new helper function to parse the timeframe string ---
     try:
@@ -100,89 +296,169 @@ def get_stock_bars(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    start_dt = datetime.fromisoformat(start) if start else None
-    end_dt = datetime.fromisoformat(end) if end else None
+    try:
+        start_dt = _parse_dt(start) if start else None
+        end_dt = _parse_dt(end) if end else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid start/end date: {e}")
     
-    symbol_list = [s.strip().upper() for s in symbols.split(",") if s.strip()]
+    symbol_list = _split_symbols(symbols)
 
     try:
-        request = StockBarsRequest(
-            symbol_or_symbols=symbol_list,
-            timeframe=tf_object,
-            start=start_dt,
-            end=end_dt,
-            limit=limit,
-            adjustment=adjustment,
-            sort=sort,
-            feed=feed
+        bars_request = _make_bars_request(
+            tuple(symbol_list), tf_object.value, start_dt, end_dt, limit, adjustment, sort, feed
         )
-        
-        bars = data_client.get_stock_bars(request)
-        df = bars.df
-
     except Exception as e:
-        # The SDK might raise its own validation errors (e.g., "5Day" is invalid)
         raise HTTPException(status_code=500, detail=f"Alpaca SDK error: {str(e)}")
 
-    # Convert DataFrame output to dict keyed by symbol (this part remains the same)
-    output = {}
-    if not df.empty:
-        for symbol in symbol_list:
-            if "symbol" in df.index.names:
-                symbol_df = df[df.index.get_level_values("symbol") == symbol]
-            else:
-                symbol_df = df
-            output[symbol] = symbol_df.reset_index().to_dict(orient="records")
-    else:
-        for symbol in symbol_list:
-            output[symbol] = []
-
-    return output
+    cache_key = ":".join([
+        "stocks/bars", ",".join(sorted(symbol_list)), tf_object.value,
+        str(start_dt), str(end_dt), str(limit), adjustment, sort, str(feed),
+    ])
+    output = await get_or_set(
+        cache_key,
+        _bars_cache_ttl(tf_object, end_dt),
+        lambda: run_sdk(_fetch_stock_bars, bars_request, symbol_list),
+    )
+    if accept and ARROW_STREAM in accept:
+        return Response(_columnar_to_arrow(output), media_type=ARROW_STREAM)
+    # Returned as a response so orjson writes the numpy arrays directly
+    return ORJSONResponse(output)
 
 # --- 7. Place Paper Trade Order ---
 class PlaceOrderRequest(BaseModel):
-    symbol: str = "AAPL"    # Stock symbol to trade
-    qty: int = 1            # Quantity to buy/sell
-    side: str = "buy"       # "buy" or "sell"
-    type: str = "market"    # "market", "limit", stop, stop_limit, trailing_stop
-    time_in_force: str = "day"  # Default time_in_force to "day" for simplicity, can be changed to "gtc" or others as needed
+    symbol: str = "AAPL"                          # Stock symbol to trade
+    qty: int = 1                                  # Quantity to buy/sell
+    side: OrderSide = OrderSide.BUY               # "buy" or "sell"
+    type: OrderType = OrderType.MARKET            # "market", "limit", stop, stop_limit, trailing_stop
+    time_in_force: TimeInForce = TimeInForce.DAY  # Default time_in_force to "day" for simplicity, can be changed to "gtc" or others as needed
     
 @app.post("/orders")
-def place_order(payload: PlaceOrderRequest): # Renamed to 'payload' for clarity
+async def place_order(payload: PlaceOrderRequest):
     """Place a paper trade order (buy or sell)."""
-    # --- FIX: Create the OrderRequest using data FROM the payload ---
-    order_data = OrderRequest(
+    # FastAPI has already validated the payload against the SDK enums, so skip a second validation pass
+    order_data = OrderRequest.model_construct(
         symbol=payload.symbol.upper(),
         qty=payload.qty,
-        side=payload.side.lower(),
+        side=payload.side,
         type=payload.type,
         time_in_force=payload.time_in_force
     )
 
     try:
-        order_response = trading_client.submit_order(order_data=order_data)
-        
-        return {"order": order_response.dict()}
+        order_response = await run_sdk(trading_client.submit_order, order_data=order_data)
+        return {"order": order_response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Alpaca API error: {str(e)}")
 
-
 # --- 8. Cancel Existing Order ---
 @app.post("/cancel_order/{order_id}")
-def cancel_order(order_id: str):
+async def cancel_order(order_id: str):
     """Cancel a specific order by ID."""
     try:
-        resp = trading_client.cancel_order_by_id(order_id)
+        await alpaca_request("DELETE", f"/v2/orders/{order_id}")
         return {"status": "cancelled", "order_id": order_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- 9. List Supported Assets ---
+# The default asset list (~10k entries) only changes between trading days, so it is
+# kept pre-encoded in memory and persisted to a date-stamped file shared by workers.
+ASSETS_CACHE_DIR = Path(os.getenv("HALAL_CACHE_DIR", Path.home() / ".cache" / "halal"))
+DEFAULT_ASSETS_PARAMS = {"status": "active", "asset_class": "us_equity"}
+
+def _read_assets_file(path: Path) -> Optional[bytes]:
+    """Return the saved asset list, or None if it is missing or not valid JSON."""
+    try:
+        body = path.read_bytes()
+        orjson.loads(body)
+        return body
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+def _write_assets_file(path: Path, body: bytes):
+    """Save the asset list atomically, so other workers never read a half-written file."""
+    ASSETS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=ASSETS_CACHE_DIR, prefix=".assets.", suffix=".tmp",
+                                     delete=False) as tmp:
+        tmp.write(body)
+    os.replace(tmp.name, path)
+    for stale in ASSETS_CACHE_DIR.glob("assets.*.json"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+async def _warm_assets_cache():
+    """Load today's default asset list from disk, or fetch it from Alpaca and save it."""
+    today = date.today().isoformat()
+    path = ASSETS_CACHE_DIR / f"assets.{today}.json"
+    try:
+        body = await asyncio.to_thread(_read_assets_file, path)
+        if body is None:
+            assets = await alpaca_request("GET", "/v2/assets", params=DEFAULT_ASSETS_PARAMS)
+            body = orjson.dumps({"assets": assets})
+            await asyncio.to_thread(_write_assets_file, path, body)
+    except Exception:
+        # Never block startup on this; /assets falls back to a live request
+        body = None
+    app.state.assets_body = body
+    app.state.assets_day = today
+
 @app.get("/assets")
-def get_assets(status: str = "active", asset_class: str = "us_equity"):
+async def get_assets(status: str = "active", asset_class: str = "us_equity"):
     """Fetch all supported (tradable) assets."""
+    if status == DEFAULT_ASSETS_PARAMS["status"] and asset_class == DEFAULT_ASSETS_PARAMS["asset_class"]:
+        if app.state.assets_day != date.today().isoformat():
+            await _warm_assets_cache()
+        if app.state.assets_body is not None:
+            return Response(app.state.assets_body, media_type="application/json")
     try:
-        assets = trading_client.get_all_assets(status=status, asset_class=asset_class)
-        return {"assets": [a.dict() for a in assets]}
+        params = {"status": status, "asset_class": asset_class}
+        assets = await alpaca_request("GET", "/v2/assets", params=params)
+        return {"assets": assets}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- 10. Batched Asset Profiles ---
+@app.get("/profiles")
+async def get_profiles(
+    symbols: str = Query(..., description="Comma-separated stock symbols")
+):
+    """Fetch the asset profile of several symbols concurrently (null for unknown symbols)."""
+    symbol_list = _split_symbols(symbols)
+    results = await asyncio.gather(
+        *(alpaca_request_limited("GET", f"/v2/assets/{s}") for s in symbol_list),
+        return_exceptions=True
+    )
+    return {
+        "profiles": {
+            s: (None if isinstance(r, Exception) else r)
+            for s, r in zip(symbol_list, results)
+        }
+    }
+
+# --- 11. Batched Latest Quotes ---
+@app.get("/stocks/quotes")
+async def get_stock_quotes(
+    symbols: str = Query("AAPL", description="Comma-separated stock symbols"),
+    feed: Optional[str] = Query("iex", description="Data feed (e.g. sip, iex, otc)")
+):
+    """Fetch the latest snapshot (quote, trade, daily bar) for several symbols in one call."""
+    params = {"symbols": ",".join(_split_symbols(symbols)), "feed": feed}
+    try:
+        snapshots = await alpaca_request("GET", f"{ALPACA_DATA_URL}/v2/stocks/snapshots", params=params)
+        return {"quotes": snapshots}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- 12. Dashboard Summary ---
+@app.get("/dashboard/summary")
+async def get_dashboard_summary():
+    """Fetch account state and open positions together, in one round trip for the client."""
+    try:
+        account, positions = await asyncio.gather(
+            alpaca_request("GET", "/v2/account"),
+            alpaca_request("GET", "/v2/positions"),
+        )
+        return {"account": account, "positions": positions}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
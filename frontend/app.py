@@ -1,41 +1,155 @@
 # /frontend/app.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import orjson
 import streamlit as st
 import requests
 import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from indicators import sma
 
 # --- Configuration ---
 st.set_page_config(layout="wide", page_title="Halal Money MVP", page_icon="📈")
 BACKEND_URL = "http://127.0.0.1:8000"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ORDERS_PAGE_SIZE = 50
+HTTP_TIMEOUT = (2.0, 5.0)    # (connect, read) seconds, so a hung backend can't wedge a rerun
+ORDER_TIMEOUT = (2.0, 10.0)  # order submission waits on Alpaca, so allow a longer read
+BARS_TIMEOUT = (2.0, 20.0)   # a cold multi-symbol bars fetch can take a while upstream
+
+@st.cache_resource
+def get_session():
+    """Creates one keep-alive session, shared across reruns, for all backend calls."""
+    session = requests.Session()
+    session.headers["Connection"] = "keep-alive"
+    # Retry only covers idempotent methods by default, so orders are never re-sent.
+    # Read timeouts aren't retried either: the backend is still working on the first request.
+    retries = Retry(total=2, read=0, backoff_factor=0.1)
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries))
+    return session
+
+SESSION = get_session()
 
 # --- Helper Functions ---
+@st.cache_data(ttl=10, show_spinner=False)
 def get_account_info():
     """Fetches account data from the backend."""
     try:
-        response = requests.get(f"{BACKEND_URL}/account")
+        response = SESSION.get(f"{BACKEND_URL}/account", timeout=HTTP_TIMEOUT)
         response.raise_for_status()
-        return response.json().get('account', {})
-    except requests.exceptions.RequestException as e:
+        return orjson.loads(response.content).get('account', {})
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
         st.error(f"Failed to connect to backend: {e}")
         return None
 
+@st.cache_data(ttl=5, show_spinner=False)
 def get_positions():
     """Fetches current positions."""
     try:
-        response = requests.get(f"{BACKEND_URL}/positions")
+        response = SESSION.get(f"{BACKEND_URL}/positions", timeout=HTTP_TIMEOUT)
         response.raise_for_status()
-        return response.json().get('positions', [])
-    except requests.exceptions.RequestException:
+        return orjson.loads(response.content).get('positions', [])
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError):
         return []
 
-def get_orders(status='all'):
-    """Fetches orders with a given status."""
+def fetch_orders(status, limit, until=None):
+    """Fetches one page of orders with a given status, newest first, submitted before `until`."""
+    params = {"status": status, "limit": limit}
+    if until:
+        params["until"] = until
     try:
-        response = requests.get(f"{BACKEND_URL}/orders", params={"status": status})
+        response = SESSION.get(f"{BACKEND_URL}/orders", params=params, timeout=HTTP_TIMEOUT)
         response.raise_for_status()
-        return response.json().get('orders', [])
-    except requests.exceptions.RequestException:
+        return orjson.loads(response.content).get('orders', [])
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError):
         return []
 
+@st.cache_data(ttl=5, show_spinner=False)
+def get_orders(status='all', limit=50):
+    """Fetches the newest page of orders, where new orders and fills show up."""
+    return fetch_orders(status, limit)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_older_orders(status, limit, until):
+    """Fetches the page of orders submitted before `until` (the previous page's last order)."""
+    return fetch_orders(status, limit, until)
+
+@st.cache_data(ttl=5, show_spinner=False)
+def get_dashboard_summary():
+    """Fetches account info and positions in one backend call (None if unavailable)."""
+    try:
+        response = SESSION.get(f"{BACKEND_URL}/dashboard/summary", timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError):
+        return None
+
+POSITION_COLUMNS = {
+    "Current Price": st.column_config.NumberColumn(format="$%.2f"),
+    "Market Value": st.column_config.NumberColumn(format="$%.2f"),
+    "Unrealized P&L": st.column_config.NumberColumn(format="$%.2f"),
+    "P&L %": st.column_config.NumberColumn(format="%.2f%%"),
+}
+
+POSITION_FIELDS = ['symbol', 'qty', 'side', 'current_price', 'market_value', 'unrealized_pl', 'cost_basis']
+POSITION_LABELS = {
+    'symbol': "Symbol", 'qty': "Qty", 'side': "Side", 'current_price': "Current Price",
+    'market_value': "Market Value", 'unrealized_pl': "Unrealized P&L",
+}
+
+def positions_frame(positions):
+    """Builds the positions table column by column, keeping numbers numeric (and sortable)."""
+    df = pd.DataFrame.from_records(positions, columns=POSITION_FIELDS)
+    # Alpaca sends numbers as strings; parse each column in one vectorized pass
+    for field in ('qty', 'current_price', 'market_value', 'unrealized_pl', 'cost_basis'):
+        df[field] = pd.to_numeric(df[field], errors='coerce').fillna(0.0)
+
+    # cost_basis is negative for shorts, so divide by its size to keep the sign of the P&L
+    unrealized_pl, cost_basis = df['unrealized_pl'].to_numpy(), np.abs(df.pop('cost_basis').to_numpy())
+    df["P&L %"] = np.divide(unrealized_pl * 100, cost_basis,
+                            out=np.zeros(len(df)), where=cost_basis != 0)
+    return df.rename(columns=POSITION_LABELS)
+
+ORDER_FIELDS = ['symbol', 'qty', 'side', 'type', 'status', 'filled_at', 'submitted_at']
+
+def orders_frame(orders):
+    """Builds the order history table with one vectorized pass per column."""
+    df = pd.DataFrame.from_records(orders, columns=ORDER_FIELDS)
+    df['qty'] = pd.to_numeric(df['qty'], errors='coerce')
+    for field in ('side', 'type', 'status'):
+        df[field] = df[field].str.upper()
+    df['filled_at'] = df['filled_at'].fillna('N/A')
+    return df
+
+def fetch_concurrently(*fetchers):
+    """Runs independent backend fetches at the same time and returns their results in order."""
+    ctx = get_script_run_ctx()
+
+    def run(fetcher):
+        # Let helpers that call st.* (e.g. st.error) render from the worker thread
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fetcher()
+
+    with ThreadPoolExecutor(max_workers=len(fetchers)) as executor:
+        return list(executor.map(run, fetchers))
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_stock_bars(symbols, timeframe, limit):
+    """Fetches OHLCV bars for several symbols as one DataFrame with a 'symbol' column."""
+    import pyarrow as pa  # only the Market Data page needs Arrow
+
+    params = {"symbols": symbols, "timeframe": timeframe, "limit": limit}
+    # Ask for Arrow so the bars arrive as a ready-made columnar table
+    response = SESSION.get(f"{BACKEND_URL}/stocks/bars", params=params,
+                           headers={"Accept": ARROW_STREAM}, timeout=BARS_TIMEOUT)
+    response.raise_for_status()
+    return pa.ipc.open_stream(response.content).read_all().to_pandas()
+
 # --- Main App Layout ---
 st.title("📈 Halal Money MVP Dashboard")
 
@@ -47,8 +161,17 @@ page = st.sidebar.radio("Navigate", ["Dashboard", "Trading", "Market Data"])
 # ==============================================================================
 if page == "Dashboard":
     st.header("Account Dashboard")
+    if st.button("Refresh"):
+        get_dashboard_summary.clear()
+        get_account_info.clear()
+        get_positions.clear()
 
-    account_info = get_account_info()
+    summary = get_dashboard_summary()
+    if summary is not None:
+        account_info, positions = summary.get('account', {}), summary.get('positions', [])
+    else:
+        # Summary endpoint unavailable: fall back to the individual calls, run concurrently
+        account_info, positions = fetch_concurrently(get_account_info, get_positions)
     if account_info:
         col1, col2, col3, col4 = st.columns(4)
         col1.metric("Equity", f"${float(account_info.get('equity', 0)):,.2f}")
@@ -57,10 +180,8 @@ if page == "Dashboard":
         col4.metric("Daytrade Count", account_info.get('daytrade_count', 0))
 
     st.subheader("Current Positions")
-    positions = get_positions()
     if positions:
-        df_positions = pd.DataFrame(positions)
-        st.dataframe(df_positions[['symbol', 'qty', 'side', 'market_value', 'unrealized_pl', 'current_price']])
+        st.dataframe(positions_frame(positions), hide_index=True, column_config=POSITION_COLUMNS)
     else:
         st.info("No open positions.")
 
@@ -89,8 +210,14 @@ elif page == "Trading":
                 "time_in_force": time_in_force
             }
             try:
-                response = requests.post(f"{BACKEND_URL}/orders", json=payload)
+                response = SESSION.post(f"{BACKEND_URL}/orders", json=payload, timeout=ORDER_TIMEOUT)
                 response.raise_for_status()
+                # The order changes history, and once filled, positions and buying power too
+                get_orders.clear()
+                get_older_orders.clear()
+                get_positions.clear()
+                get_account_info.clear()
+                get_dashboard_summary.clear()
                 st.success(f"Order submitted successfully!")
                 st.json(response.json())
             except requests.exceptions.RequestException as e:
@@ -98,14 +225,35 @@ elif page == "Trading":
                 st.error(f"Failed to place order: {error_data}")
     
     # --- View Existing Orders ---
-    st.subheader("Order History")
-    order_status_filter = st.selectbox("Filter orders by status", ["all", "open", "closed"])
-    orders = get_orders(order_status_filter)
-    if orders:
-        df_orders = pd.DataFrame(orders)
-        st.dataframe(df_orders[['symbol', 'qty', 'side', 'type', 'status', 'filled_at', 'submitted_at']])
-    else:
-        st.info(f"No {order_status_filter} orders found.")
+    # A fragment, so changing the filter only reruns this block, not the order form
+    @st.fragment
+    def order_history():
+        st.subheader("Order History")
+        order_status_filter = st.selectbox("Filter orders by status", ["all", "open", "closed"])
+        if st.button("Refresh Orders"):
+            get_orders.clear()
+            get_older_orders.clear()
+            st.session_state.pop('order_pages', None)  # back to the first page only
+
+        # Number of pages loaded per filter; "Load more" bumps it. Each older page's cursor is
+        # the last order of the page fetched just before it in this run, so pages stay
+        # contiguous when new orders arrive. Only the newest page is re-fetched every rerun.
+        loaded = st.session_state.setdefault('order_pages', {})
+        page_count = loaded.setdefault(order_status_filter, 1)
+        pages = [get_orders(order_status_filter, ORDERS_PAGE_SIZE)]
+        while len(pages) < page_count and len(pages[-1]) == ORDERS_PAGE_SIZE:
+            until = pages[-1][-1]['submitted_at']
+            pages.append(get_older_orders(order_status_filter, ORDERS_PAGE_SIZE, until))
+        orders = [order for page in pages for order in page]
+        if orders:
+            st.dataframe(orders_frame(orders), hide_index=True)
+            if len(pages[-1]) == ORDERS_PAGE_SIZE:
+                st.button("Load more", on_click=loaded.__setitem__,
+                          args=(order_status_filter, len(pages) + 1))
+        else:
+            st.info(f"No {order_status_filter} orders found.")
+
+    order_history()
 
 # ==============================================================================
 # 3. MARKET DATA PAGE
@@ -113,33 +261,38 @@ elif page == "Trading":
 elif page == "Market Data":
     st.header("Market Data & Charting")
     
-    c1, c2, c3 = st.columns(3)
-    symbols_input = c1.text_input("Symbols (comma-separated)", "AAPL,TSLA").upper()
-    timeframe_input = c2.selectbox("Timeframe", ["15Min", "1Day", "1Hour", "5Min", "1Min"])
-    limit_input = c3.number_input("Bar Limit", min_value=1, max_value=1000, value=100)
-    
-    if st.button("Get Market Data"):
-        params = {
-            "symbols": symbols_input,
-            "timeframe": timeframe_input,
-            "limit": limit_input
-        }
-        try:
-            response = requests.get(f"{BACKEND_URL}/stocks/bars", params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            for symbol, bars in data.items():
-                if bars:
-                    st.subheader(f"Chart for {symbol}")
-                    df = pd.DataFrame(bars)
-                    df['timestamp'] = pd.to_datetime(df['timestamp'])
-                    df.set_index('timestamp', inplace=True)
-                    st.line_chart(df['close'])
+    # A fragment, so editing the inputs or fetching bars only reruns this block
+    @st.fragment
+    def market_data():
+        c1, c2, c3 = st.columns(3)
+        symbols_input = c1.text_input("Symbols (comma-separated)", "AAPL,TSLA").upper()
+        timeframe_input = c2.selectbox("Timeframe", ["15Min", "1Day", "1Hour", "5Min", "1Min"])
+        limit_input = c3.number_input("Bar Limit", min_value=1, max_value=1000, value=100)
+
+        if st.button("Get Market Data"):
+            try:
+                bars_df = get_stock_bars(symbols_input, timeframe_input, int(limit_input))
+                requested = [s.strip() for s in symbols_input.split(",") if s.strip()]
+                returned = set(bars_df['symbol']) if not bars_df.empty else set()
+                for symbol in requested:
+                    if symbol not in returned:
+                        st.warning(f"No data returned for {symbol}.")
+
+                if returned:
+                    # One long-to-wide pivot and one chart for every symbol, instead of a chart each
+                    st.subheader("Close Prices")
+                    with_sma = bars_df.assign(**{"SMA 20": bars_df.groupby('symbol', observed=True)['close']
+                                                 .transform(lambda c: sma(c.to_numpy(), 20))})
+                    chart_df = with_sma.pivot(index='timestamp', columns='symbol', values=['close', 'SMA 20'])
+                    chart_df.columns = [sym if value == 'close' else f"{sym} {value}"
+                                        for value, sym in chart_df.columns]
+                    st.line_chart(chart_df)
+
+                # One table for every symbol instead of an expander per chart
+                if not bars_df.empty:
                     with st.expander("View Raw Data"):
-                        st.dataframe(df)
-                else:
-                    st.warning(f"No data returned for {symbol}.")
-        except requests.exceptions.RequestException as e:
-            st.error(f"Failed to fetch market data: {e}")
+                        st.dataframe(bars_df, hide_index=True)
+            except requests.exceptions.RequestException as e:
+                st.error(f"Failed to fetch market data: {e}")
 
+    market_data()
@@ -0,0 +1,55 @@
+# /frontend/indicators.py
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the kernels still run as plain Python
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# --- Moving averages on raw numpy arrays ---
+# Each function takes a 1-D float array (e.g. df["close"].to_numpy()) and returns
+# an array of the same length, NaN-padded where the window is not yet full.
+# Wrap the result in pd.Series(arr, index=df.index) only when charting it.
+
+def sma(x: np.ndarray, n: int) -> np.ndarray:
+    """
+    Simple moving average over `n` bars, via a running sum. Like a rolling
+    window, a missing (NaN) close only blanks the `n` windows that contain it.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if n <= 0 or len(x) < n:
+        return out
+    # Sum the valid values and count them separately, so one NaN can't poison the running sum
+    valid = ~np.isnan(x)
+    csum = np.cumsum(np.insert(np.where(valid, x, 0.0), 0, 0.0))
+    ccount = np.cumsum(np.insert(valid, 0, False))
+    full = (ccount[n:] - ccount[:-n]) == n
+    out[n - 1:] = np.where(full, (csum[n:] - csum[:-n]) / n, np.nan)
+    return out
+
+def wma(x: np.ndarray, n: int) -> np.ndarray:
+    """Linearly weighted moving average over `n` bars (newest bar weighs most)."""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if n <= 0 or len(x) < n:
+        return out
+    weights = np.arange(1, n + 1) / (n * (n + 1) / 2)
+    out[n - 1:] = np.convolve(x, weights[::-1], mode="valid")
+    return out
+
+@njit(cache=True)  # no fastmath: it lets numba assume there are no NaNs
+def _ema_kernel(x, alpha, out):
+    out[0] = x[0]
+    for i in range(1, len(x)):
+        out[i] = alpha * x[i] + (1.0 - alpha) * out[i - 1]
+    return out
+
+def ema(x: np.ndarray, alpha: float) -> np.ndarray:
+    """Exponential moving average with smoothing factor `alpha` (e.g. 2 / (n + 1))."""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.empty_like(x)
+    if len(x) == 0:
+        return out
+    return _ema_kernel(x, alpha, out)
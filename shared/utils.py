@@ -1,32 +1,48 @@
-import re
+from functools import lru_cache
+from types import MappingProxyType
 from alpaca.data.timeframe import TimeFrameUnit, TimeFrame
 
+# --- Common timeframes, built once at import ---
+_TF_TABLE = {
+    f"{amount}{unit.value}": TimeFrame(amount, unit)
+    for amount, unit in (
+        (1, TimeFrameUnit.Minute), (5, TimeFrameUnit.Minute),
+        (15, TimeFrameUnit.Minute), (30, TimeFrameUnit.Minute),
+        (1, TimeFrameUnit.Hour), (2, TimeFrameUnit.Hour), (4, TimeFrameUnit.Hour),
+        (1, TimeFrameUnit.Day), (1, TimeFrameUnit.Week), (1, TimeFrameUnit.Month),
+    )
+}
+
+# Map the unit string to the TimeFrameUnit enum
+_UNIT_MAP = MappingProxyType({
+    "Min": TimeFrameUnit.Minute,
+    "Hour": TimeFrameUnit.Hour,
+    "Day": TimeFrameUnit.Day,
+    "Week": TimeFrameUnit.Week,
+    "Month": TimeFrameUnit.Month,
+})
+
 # --- HELPER FUNCTION: Parse string to TimeFrame object ---
 def parse_timeframe(timeframe_str: str) -> TimeFrame:
     """
     Parses a string like "5Min" into an Alpaca SDK TimeFrame object.
     e.g., "15Min" -> TimeFrame(15, TimeFrameUnit.Minute)
+    Common timeframes are a single dict lookup; others are parsed once and memoized.
     """
-    # Use a regular expression to extract the number and the unit
-    match = re.match(r"(\d+)(Min|Hour|Day|Week|Month)", timeframe_str)
-    if not match:
-        raise ValueError(f"Invalid timeframe format: '{timeframe_str}'. Expected format like '1Min', '1Day', etc.")
+    return _TF_TABLE.get(timeframe_str) or _parse_timeframe(timeframe_str)
 
-    amount, unit_str = match.groups()
-    amount = int(amount)
+@lru_cache(maxsize=64)
+def _parse_timeframe(timeframe_str: str) -> TimeFrame:
+    # Split "<digits><unit>" by scanning past the leading digits, then look up the suffix
+    i = 0
+    while i < len(timeframe_str) and "0" <= timeframe_str[i] <= "9":
+        i += 1
+    if i == 0:
+        raise ValueError(f"Invalid timeframe format: '{timeframe_str}'. Expected format like '1Min', '1Day', etc.")
 
-    # Map the unit string to the TimeFrameUnit enum
-    unit_map = {
-        "Min": TimeFrameUnit.Minute,
-        "Hour": TimeFrameUnit.Hour,
-        "Day": TimeFrameUnit.Day,
-        "Week": TimeFrameUnit.Week,
-        "Month": TimeFrameUnit.Month,
-    }
-    unit = unit_map.get(unit_str)
-    
-    if not unit:
-         raise ValueError(f"Invalid timeframe unit in '{timeframe_str}'")
+    unit = _UNIT_MAP.get(timeframe_str[i:])
+    if unit is None:
+        raise ValueError(f"Invalid timeframe unit in '{timeframe_str}'")
 
     # The SDK's own validation will run inside the TimeFrame constructor
-    return TimeFrame(amount, unit)
\ No newline at end of file
+    return TimeFrame(int(timeframe_str[:i]), unit)